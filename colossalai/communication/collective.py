@@ -10,6 +10,15 @@ from colossalai.context import ParallelMode
 from colossalai.core import global_context as gpc
 from colossalai.utils import get_current_device
 
+# gather into a flat output tensor directly when supported, which avoids
+# splitting the output into a list of tensors in all_gather
+if hasattr(dist, 'all_gather_into_tensor'):
+    _all_gather_into_tensor = dist.all_gather_into_tensor
+elif hasattr(dist, '_all_gather_base'):
+    _all_gather_into_tensor = dist._all_gather_base
+else:
+    _all_gather_into_tensor = None
+
 
 def all_gather(tensor: Tensor, dim: int, parallel_mode: ParallelMode, async_op: bool = False) -> Tensor:
     """Gathers all tensors from the parallel group and concatenates them in a 
@@ -37,11 +46,15 @@ def all_gather(tensor: Tensor, dim: int, parallel_mode: ParallelMode, async_op:
         shape[0], shape[dim] = shape[dim], shape[0]
         shape[0] *= depth
         out = torch.empty(shape, dtype=tensor.dtype, device=get_current_device())
-        temp = list(torch.chunk(out, depth, dim=0))
-        work = dist.all_gather(tensor_list=temp,
-                               tensor=tensor.transpose(0, dim).contiguous(),
-                               group=gpc.get_group(parallel_mode),
-                               async_op=async_op)
+        group = gpc.get_group(parallel_mode)
+        if _all_gather_into_tensor is not None and dist.get_backend(group) == dist.Backend.NCCL:
+            work = _all_gather_into_tensor(out, tensor.transpose(0, dim).contiguous(), group=group, async_op=async_op)
+        else:
+            temp = list(torch.chunk(out, depth, dim=0))
+            work = dist.all_gather(tensor_list=temp,
+                                   tensor=tensor.transpose(0, dim).contiguous(),
+                                   group=group,
+                                   async_op=async_op)
         out = torch.transpose(out, 0, dim)
     if async_op:
         return out, work
@@ -1,6 +1,28 @@
+import os
 import torch
 import torch.distributed as dist
 from .parallel_mode import ParallelMode
+from .process_group_initializer.process_group_initializer import LOCAL_SYNC_KWARGS
+
+# process groups created for MoE, keyed by the tuple of ranks in the group,
+# so that MoE infos sharing the same ranks reuse the same communicator
+_GROUP_CACHE = dict()
+
+
+def _get_group(ranks):
+    key = tuple(ranks)
+    # new_group may return None on non-member ranks, so test the key rather than the value
+    if key not in _GROUP_CACHE:
+        _GROUP_CACHE[key] = dist.new_group(ranks, **LOCAL_SYNC_KWARGS)
+    return _GROUP_CACHE[key]
+
+
+def _warmup_group(group):
+    # the first collective on a new NCCL communicator triggers topology detection,
+    # pay this cost here instead of in the first forward of MoE layers
+    from colossalai.utils import get_current_device
+    buf = torch.zeros(1, device=get_current_device())
+    dist.all_reduce(buf, group=group)
 
 
 def _check_sanity():
@@ -40,38 +62,48 @@ class MoeInfo:
             return
 
         rank = dist.get_rank()
+        # Each rank belongs to exactly one expert parallel group and one data parallel group,
+        # so membership can be checked arithmetically and other groups are not stored
+        ep_idx = rank // ep_size
+        dp_idx = rank % ep_size
+
         # Create expert parallel group
         for i in range(dp_size):
-            ranks = [i * ep_size + j for j in range(ep_size)]
-            group = dist.new_group(ranks)
-            if rank in ranks:
+            ranks = list(range(i * ep_size, (i + 1) * ep_size))
+            group = _get_group(ranks)
+            if i == ep_idx:
                 self.ep_group = group
 
         # Create data parallel group
         for j in range(ep_size):
-            ranks = [i * ep_size + j for i in range(dp_size)]
-            group = dist.new_group(ranks)
-            if rank in ranks:
+            ranks = list(range(j, dp_size * ep_size, ep_size))
+            group = _get_group(ranks)
+            if j == dp_idx:
                 self.dp_group = group
 
+        # Set COLOSSAL_MOE_WARMUP_COMMS=1 to warm up communicators when MoE groups are built
+        if os.environ.get('COLOSSAL_MOE_WARMUP_COMMS', '0') == '1':
+            _warmup_group(self.ep_group)
+            _warmup_group(self.dp_group)
+            torch.cuda.synchronize()
+
 
 class MoeContext:
     """MoE parallel context manager. This class manages different
     parallel groups in MoE context and MoE loss in training.
     """
-    __instance = None
 
     @staticmethod
     def get_instance():
-        if MoeContext.__instance is None:
-            MoeContext.__instance = MoeContext()
-        return MoeContext.__instance
+        return MOE_CONTEXT
 
     def __init__(self):
         self.world_size = 1
         # Users may want to set maximum expert parallel size smaller than the world size
         # since very low bandwidth across nodes may constrain the performance of MoE
         # When we have a maximum expert parallel size, we have a minimum data parallel size naturally
+        # setup is the only writer of max_ep_size, it must not be changed afterwards
+        # since expert placement and cached MoE information depend on it
         self.max_ep_size = 1
         self.min_dp_size = 1
         self.aux_loss = None
@@ -79,6 +111,8 @@ class MoeContext:
 
         self.has_setup = False
         self._info_dict = dict()
+        # placement plan (num_local_experts, ep_size, dp_size) for each number of experts
+        self._plan_cache = dict()
 
     @property
     def information(self):
@@ -101,6 +135,8 @@ class MoeContext:
         assert self.world_size % self.max_ep_size == 0, \
             "Maximum epxert parallel size must be a factor of the number of GPUs"
         self.min_dp_size = self.world_size // self.max_ep_size
+        # placement plans depend on max_ep_size
+        self._plan_cache.clear()
 
         # Enabling kernel optimization may raise error in some cases
         # Users can close kernel optimization manually
@@ -115,6 +151,20 @@ class MoeContext:
         distributed communication groups.
         """
 
+        plan = self._plan_cache.get(num_experts)
+        if plan is None:
+            plan = self._plan_experts(num_experts)
+            self._plan_cache[num_experts] = plan
+        num_local_experts, ep_size, dp_size = plan
+
+        info = self._info_dict.get(ep_size)
+        if info is None:
+            info = MoeInfo(ep_size, dp_size)
+            self._info_dict[ep_size] = info
+
+        return num_local_experts, info
+
+    def _plan_experts(self, num_experts: int):
         gt_flag = num_experts % self.max_ep_size == 0    # check whether num_experts is greater
         lt_flag = self.max_ep_size % num_experts == 0    # check whether num_experts is less
 
@@ -133,10 +183,7 @@ class MoeContext:
 
         # Don't forget to multiply minimum data parallel size
         dp_size *= self.min_dp_size
-        if not (ep_size in self.information):
-            self.information[ep_size] = MoeInfo(ep_size, dp_size)
-
-        return num_local_experts, self.information[ep_size]
+        return num_local_experts, ep_size, dp_size
 
     def set_kernel_not_use(self):
         self.use_kernel_optim = False
@@ -149,3 +196,6 @@ class MoeContext:
 
     def get_loss(self):
         return self.aux_loss
+
+
+MOE_CONTEXT = MoeContext()
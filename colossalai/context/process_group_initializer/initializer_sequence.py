@@ -4,7 +4,7 @@ import torch.distributed as dist
 
 from colossalai.registry import DIST_GROUP_INITIALIZER
 from .initializer_tensor import Initializer_Tensor
-from .process_group_initializer import ProcessGroupInitializer
+from .process_group_initializer import ProcessGroupInitializer, LOCAL_SYNC_KWARGS
 from ..parallel_mode import ParallelMode
 
 
@@ -37,11 +37,11 @@ class Initializer_Sequence_DP(ProcessGroupInitializer):
         mode = ParallelMode.SEQUENCE_DP
 
         for i in range(self.num_group):
-            ranks = [i * self.dp_size + j for j in range(self.dp_size)]
-            group = dist.new_group(ranks)
+            ranks = list(range(i * self.dp_size, (i + 1) * self.dp_size))
+            group = dist.new_group(ranks, **LOCAL_SYNC_KWARGS)
 
-            if self.rank in ranks:
-                local_rank = ranks.index(self.rank)
+            if i == self.rank // self.dp_size:
+                local_rank = self.rank - i * self.dp_size
                 group_world_size = len(ranks)
                 process_group = group
                 ranks_in_group = ranks
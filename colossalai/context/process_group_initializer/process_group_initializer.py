@@ -1,10 +1,17 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
+import inspect
 from abc import ABC, abstractmethod
 
+import torch.distributed as dist
 from colossalai.context import Config
 
+# use_local_synchronization is only available in newer versions of PyTorch,
+# it lets group creation synchronize only among the member ranks
+LOCAL_SYNC_KWARGS = dict(use_local_synchronization=True) \
+    if 'use_local_synchronization' in inspect.signature(dist.new_group).parameters else dict()
+
 
 class ProcessGroupInitializer(ABC):
     """An object, knowing the parallelism configuration, that initializes parallel groups.
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
-from colossalai.context import ParallelContext, MoeContext
+from colossalai.context import ParallelContext
+from colossalai.context.moe_context import MOE_CONTEXT
 
 global_context = ParallelContext.get_instance()
-MOE_CONTEXT = MoeContext.get_instance()
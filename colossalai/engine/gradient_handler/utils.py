@@ -1,10 +1,25 @@
 import torch.distributed as dist
 import torch.nn as nn
 from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
-from typing import Iterable
+from typing import Iterable, List, Optional
 
 
-def bucket_allreduce(param_list: Iterable[nn.Parameter], group=None):
+def _split_by_size(params: List[nn.Parameter], bucket_size: int) -> List[List[nn.Parameter]]:
+    # start a new bucket whenever adding a gradient would exceed bucket_size bytes,
+    # a gradient larger than bucket_size forms a bucket of its own
+    buckets = [[]]
+    cur_size = 0
+    for param in params:
+        grad_size = param.grad.numel() * param.grad.element_size()
+        if len(buckets[-1]) > 0 and cur_size + grad_size > bucket_size:
+            buckets.append([])
+            cur_size = 0
+        buckets[-1].append(param)
+        cur_size += grad_size
+    return buckets
+
+
+def bucket_allreduce(param_list: Iterable[nn.Parameter], group=None, bucket_size: Optional[int] = None):
     # get communication world size
     comm_size = dist.get_world_size(group)
     # bucketize and all-reduce
@@ -17,9 +32,14 @@ def bucket_allreduce(param_list: Iterable[nn.Parameter], group=None):
                 buckets[tp] = []
             buckets[tp].append(param)
 
+    # Optionally cap the number of bytes in each bucket.
+    if bucket_size is not None:
+        buckets = [bucket for tp in buckets for bucket in _split_by_size(buckets[tp], bucket_size)]
+    else:
+        buckets = list(buckets.values())
+
     # For each bucket, all-reduce and copy all-reduced grads.
-    for tp in buckets:
-        bucket = buckets[tp]
+    for bucket in buckets:
         grads = [param.grad.data for param in bucket]
         coalesced = _flatten_dense_tensors(grads)
         coalesced /= comm_size
@@ -50,9 +50,9 @@ class Top1Router(nn.Module):
 
         assert select_policy in {"first", "random"}
         if select_policy == "random":
-            self.uniform = torch.distributions.uniform.Uniform(low=torch.tensor(0.0, device=get_current_device()),
-                                                               high=torch.tensor(1.0,
-                                                                                 device=get_current_device())).rsample
+            device = get_current_device()
+            self.uniform = torch.distributions.uniform.Uniform(low=torch.tensor(0.0, device=device),
+                                                               high=torch.tensor(1.0, device=device)).rsample
 
     def get_capacity(
         self,
@@ -1,10 +1,16 @@
 import torch
 import torch.nn.functional as F
-from colossalai.utils import get_current_device
 from colossalai.core import MOE_CONTEXT
 from .experts import FFNExperts, TPExperts
 
 
+def _reuse_or_alloc(buf, inputs: torch.Tensor):
+    # noise is always kept in fp32, small noise would round away in fp16 logits
+    if buf is None or buf.shape != inputs.shape or buf.device != inputs.device:
+        buf = torch.empty(inputs.shape, dtype=torch.float32, device=inputs.device)
+    return buf
+
+
 class NormalNoiseGenerator:
     """Generates a random noisy mask for logtis tensor.
 
@@ -16,12 +22,13 @@ class NormalNoiseGenerator:
     """
 
     def __init__(self, num_experts: int):
-        self.normal = torch.distributions.normal.Normal(loc=torch.tensor(0.0, device=get_current_device()),
-                                                        scale=torch.tensor(1.0 / num_experts**2,
-                                                                           device=get_current_device())).rsample
+        self.std = 1.0 / num_experts**2
+        self._buf = None
 
     def __call__(self, inputs: torch.Tensor):
-        noisy = self.normal(inputs.shape)
+        # addition does not save the noise for backward, so the buffer can be refilled every call
+        self._buf = _reuse_or_alloc(self._buf, inputs)
+        noisy = self._buf.normal_(mean=0.0, std=self.std)
         return inputs + noisy
 
 
@@ -37,20 +44,19 @@ class UniformNoiseGenerator:
     """
 
     def __init__(self, eps: float = 1e-2):
-        self.uniform = torch.distributions.uniform.Uniform(low=torch.tensor(1.0 - eps, device=get_current_device()),
-                                                           high=torch.tensor(1.0 + eps,
-                                                                             device=get_current_device())).rsample
+        self.eps = eps
 
     def __call__(self, inputs: torch.Tensor):
-        noisy = self.uniform(inputs.shape)
+        noisy = torch.empty(inputs.shape, dtype=torch.float32, device=inputs.device)
+        noisy.uniform_(1.0 - self.eps, 1.0 + self.eps)
         return inputs * noisy
 
 
 def autocast_softmax(inputs: torch.Tensor, dim: int):
     assert inputs.dtype in {torch.float16, torch.float32}
-    fp16_flag = (inputs.dtype == torch.float16)
-    sm_input = inputs.to(torch.float32) if fp16_flag else inputs
-    sm_output = F.softmax(sm_input, dim)
+    # softmax of fp16 inputs is computed and returned in fp32 without an explicit upcast copy
+    sm_dtype = torch.float32 if inputs.dtype == torch.float16 else None
+    sm_output = F.softmax(inputs, dim, dtype=sm_dtype)
     return sm_output
 
 
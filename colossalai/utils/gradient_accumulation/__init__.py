@@ -5,6 +5,7 @@ from typing import Iterable
 from torch.optim import Optimizer
 from torch.optim.lr_scheduler import _LRScheduler
 from ._gradient_accumulation import GradAccumDataloader, GradAccumOptimizer, GradAccumLrSchedulerByStep, GradAccumGradientHandler
+from ._gradient_accumulation import _GradAccumState
 
 
 def accumulate_gradient(model: nn.Module,
@@ -12,7 +13,9 @@ def accumulate_gradient(model: nn.Module,
                         dataloader: Iterable,
                         accumulate_size: int,
                         gradient_handlers: List[BaseGradientHandler] = None,
-                        lr_scheduler: _LRScheduler = None):
+                        lr_scheduler: _LRScheduler = None,
+                        fuse_grads: bool = False,
+                        bucket_size_mb: int = 25):
     """
     :param model: your model object
     :type model: :class:`torch.nn.Module`
@@ -26,15 +29,30 @@ def accumulate_gradient(model: nn.Module,
     :type gradient_handlers: List[:class:`colossalai.engine.BaseGradientHandler`]
     :param lr_scheduler: your lr scheduler object. Default is None
     :type lr_scheduler: `torch.optim.lr_scheduler._LRScheduler`
+    :param fuse_grads: whether the optimizer all-reduces gradients in buckets over the data parallel group,
+        see :class:`GradAccumOptimizer`. It is not set by :func:`colossalai.initialize`, which reduces
+        gradients with gradient handlers instead. Default is False
+    :type fuse_grads: bool
+    :param bucket_size_mb: the maximum size of a gradient bucket in MB when ``fuse_grads`` is enabled. Default is 25
+    :type bucket_size_mb: int
     """
-    optimizer = GradAccumOptimizer(optimizer, accumulate_size=accumulate_size, model=model)
+    # all wrappers follow the accumulation cycle driven by the optimizer's backward pass
+    state = _GradAccumState(accumulate_size)
+    optimizer = GradAccumOptimizer(optimizer,
+                                   accumulate_size=accumulate_size,
+                                   model=model,
+                                   fuse_grads=fuse_grads,
+                                   bucket_size_mb=bucket_size_mb,
+                                   state=state)
     dataloader = GradAccumDataloader(dataloader, accumulate_size=accumulate_size)
 
     if gradient_handlers is not None:
-        gradient_handlers = [GradAccumGradientHandler(handler, accumulate_size) for handler in gradient_handlers]
+        gradient_handlers = [
+            GradAccumGradientHandler(handler, accumulate_size, state=state) for handler in gradient_handlers
+        ]
 
     if lr_scheduler is not None:
-        lr_scheduler = GradAccumLrSchedulerByStep(lr_scheduler, accumulate_size=accumulate_size)
+        lr_scheduler = GradAccumLrSchedulerByStep(lr_scheduler, accumulate_size=accumulate_size, state=state)
 
     return optimizer, dataloader, gradient_handlers, lr_scheduler
 
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
+from collections import deque
+
+import torch.distributed as dist
 import torch.nn as nn
 from torch import Tensor
 from typing import Iterable, Any
@@ -9,8 +12,34 @@ from torch.nn.parallel.distributed import DistributedDataParallel
 from torch.optim import Optimizer
 from torch.optim.lr_scheduler import _LRScheduler
 from torch.utils.data import DataLoader
+from colossalai.context import ParallelMode
+from colossalai.core import global_context as gpc
 from colossalai.utils import conditional_context
 from colossalai.engine import BaseGradientHandler
+from colossalai.engine.gradient_handler.utils import bucket_allreduce
+
+
+class _GradAccumState:
+    """A micro-step counter shared by the gradient accumulation wrappers, so that they
+    all follow the same accumulation cycle
+
+    :param accumulate_size: The number of steps to accumulate gradients
+    :type accumulate_size: int
+    """
+
+    def __init__(self, accumulate_size: int):
+        self.accumulate_size = accumulate_size
+        self.counter = 0
+
+    def tick(self):
+        self.counter += 1
+
+    def should_step(self, last_step: int) -> bool:
+        """Whether at least ``accumulate_size`` micro-steps have been taken since ``last_step``, the
+        counter value at which the caller last stepped. The counter may advance by more than one per
+        step, e.g. once per micro-batch in pipeline parallelism, so this is a threshold not a multiple
+        """
+        return self.counter - last_step >= self.accumulate_size
 
 
 class GradAccumOptimizer(ColossalaiOptimizer):
@@ -23,50 +52,100 @@ class GradAccumOptimizer(ColossalaiOptimizer):
     :type accumulate_size: int
     :param model: Your model object to check if it is DDP for special handling of no_sync() context
     :type model: :class:`torch.nn.Module`
+    :param fuse_grads: Whether to all-reduce the gradients of ``model`` in buckets once accumulation
+        is complete, before they are clipped and applied. Only used when the model is not PyTorch DDP.
+        Do not enable it together with a data parallel gradient handler, otherwise gradients are
+        reduced twice. MoE parameters are not supported
+    :type fuse_grads: bool, optional
+    :param bucket_size_mb: The maximum size of a gradient bucket in MB when ``fuse_grads`` is enabled
+    :type bucket_size_mb: int, optional
+    :param group: The process group to all-reduce gradients in, defaults to the data parallel group
+    :type group: :class:`torch.distributed.ProcessGroup`, optional
+    :param state: Accumulation state shared with other gradient accumulation wrappers, the optimizer
+        advances it on every backward pass
+    :type state: :class:`_GradAccumState`, optional
 
     """
 
-    def __init__(self, optim: Optimizer, accumulate_size: int, model: nn.Module = None):
+    def __init__(self,
+                 optim: Optimizer,
+                 accumulate_size: int,
+                 model: nn.Module = None,
+                 fuse_grads: bool = False,
+                 bucket_size_mb: int = 25,
+                 group=None,
+                 state: _GradAccumState = None):
         super().__init__(optim)
         self.accumulate_size = accumulate_size
-        self.accumulate_step = 0
+        self.state = state if state is not None else _GradAccumState(accumulate_size)
+        self._last_step = 0
 
         # handle pytorch ddp auto all reduce
         self.model = model
         self.is_torch_ddp = isinstance(self.model, DistributedDataParallel)
 
+        self.fuse_grads = fuse_grads and not self.is_torch_ddp
+        self.bucket_size = bucket_size_mb * 1024 * 1024
+        self.group = group
+        # counter value at which gradients were last reduced, so that they are reduced once per cycle
+        self._last_reduce = 0
+        if self.fuse_grads:
+            assert model is not None, 'model must be given to reduce its gradients when fuse_grads is enabled'
+
+    @property
+    def accumulate_step(self):
+        return self.state.counter - self._last_step
+
     def zero_grad(self, *args, **kwargs):
         if self.accumulate_step == 0:
             self.optim.zero_grad(*args, **kwargs)
 
     def step(self, *args, **kwargs):
-        if self.accumulate_step < self.accumulate_size:
+        if not self.state.should_step(self._last_step):
             return None
-        else:
-            self.accumulate_step = 0
-            return self.optim.step(*args, **kwargs)
+        self._reduce_grads()
+        self._last_step = self.state.counter
+        return self.optim.step(*args, **kwargs)
+
+    def _reduce_grads(self):
+        # called before both clipping and stepping, the first call in a cycle does the reduction
+        if not self.fuse_grads or self._last_reduce == self.state.counter:
+            return
+        self._last_reduce = self.state.counter
+
+        # tensor parallel shards are identical across the data parallel group, so by default
+        # gradients are averaged there, as done by the data parallel gradient handler
+        group = self.group if self.group is not None else gpc.get_group(ParallelMode.DATA)
+        if dist.get_world_size(group) == 1:
+            return
+
+        # gradients live on the model parameters, mixed precision optimizers
+        # only hold master copies without gradients in their param groups
+        params = list(self.model.parameters())
+        # expert parameters are reduced in their own data parallel groups by the MoE gradient handler
+        assert not any(hasattr(param, 'moe_info') for param in params), \
+            'fuse_grads does not support MoE parameters, please use MoeGradientHandler instead'
+        bucket_allreduce(param_list=params, group=group, bucket_size=self.bucket_size)
 
     def clip_grad_norm(self, model: nn.Module, max_norm: float):
-        if self.accumulate_step < self.accumulate_size:
-            pass
-        else:
+        if self.state.should_step(self._last_step):
+            self._reduce_grads()
             self.optim.clip_grad_norm(model, max_norm)
 
     def backward(self, loss: Tensor):
-        self.accumulate_step += 1
+        self.state.tick()
+        scaled_loss = loss / self.accumulate_size
 
         if self.is_torch_ddp:
-            no_sync = self.accumulate_step < self.accumulate_size
+            no_sync = not self.state.should_step(self._last_step)
             with conditional_context(self.model.no_sync(), enable=no_sync):
-                scaled_loss = loss / self.accumulate_size
                 self.optim.backward(scaled_loss)
         else:
-            scaled_loss = loss / self.accumulate_size
             self.optim.backward(scaled_loss)
 
     def backward_by_grad(self, tensor: Tensor, grad: Tensor):
-        self.accumulate_step += 1
-        no_sync = self.is_torch_ddp and self.accumulate_step < self.accumulate_size
+        self.state.tick()
+        no_sync = self.is_torch_ddp and not self.state.should_step(self._last_step)
 
         if no_sync:
             with self.model.no_sync():
@@ -95,6 +174,11 @@ class GradAccumDataloader:
         self.consume_remain_data = not isinstance(dataloader, DataLoader)
         self.steps_per_epoch = len(dataloader) - len(dataloader) % accumulate_size
 
+        # bind frequently accessed attributes directly to skip __getattr__ forwarding
+        for attr in ('dataset', 'sampler', 'batch_size', 'num_workers'):
+            if hasattr(dataloader, attr):
+                setattr(self, attr, getattr(dataloader, attr))
+
     def __getattr__(self, __name: str) -> Any:
         return getattr(self.dataloader, __name)
 
@@ -110,15 +194,14 @@ class GradAccumDataloader:
         if self._cur_step < self.steps_per_epoch:
             self._cur_step += 1
 
+            data = next(self._dataiter)
+
             if self._cur_step == self.steps_per_epoch and self.consume_remain_data:
                 # this is to handle non standard pytorch dataloader
                 # such as dali dataloader
-                while True:
-                    try:
-                        _ = next(self._dataiter)
-                    except StopIteration:
-                        break
-            return next(self._dataiter)
+                # a zero-length deque exhausts the remaining batches without a python loop
+                deque(self._dataiter, maxlen=0)
+            return data
         else:
             raise StopIteration
 
@@ -131,13 +214,23 @@ class GradAccumLrSchedulerByStep(_LRScheduler):
     :type lr_scheduler: :class:`torch.optim.lr_scheduler._LRScheduler`    
     :param accumulate_size: The number of steps to accumulate gradients
     :type accumulate_size: int
+    :param state: Accumulation state shared with :class:`GradAccumOptimizer`. If not given,
+        the scheduler counts its own steps
+    :type state: :class:`_GradAccumState`, optional
 
     """
 
-    def __init__(self, lr_scheduler: _LRScheduler, accumulate_size: int) -> None:
+    def __init__(self, lr_scheduler: _LRScheduler, accumulate_size: int, state: _GradAccumState = None) -> None:
         self.lr_scheduler = lr_scheduler
         self.accumulate_size = accumulate_size
-        self.accumulate_step = 0
+        # a private state is advanced here, a shared state is advanced by the optimizer
+        self._owns_state = state is None
+        self.state = _GradAccumState(accumulate_size) if state is None else state
+        self._last_step = 0
+
+        # bind frequently accessed attributes directly to skip __getattr__ forwarding,
+        # last_epoch and base_lrs are not bound as stepping and load_state_dict rebind them
+        self.optimizer = lr_scheduler.optimizer
 
     @staticmethod
     def compute_effective_steps_per_epoch(dataloader: Iterable, accumulate_size: int):
@@ -146,12 +239,15 @@ class GradAccumLrSchedulerByStep(_LRScheduler):
     def __getattr__(self, __name: str) -> Any:
         return getattr(self.lr_scheduler, __name)
 
+    @property
+    def accumulate_step(self):
+        return self.state.counter - self._last_step
+
     def step(self, *args, **kwargs):
-        self.accumulate_step += 1
-        if self.accumulate_step < self.accumulate_size:
-            pass
-        else:
-            self.accumulate_step = 0
+        if self._owns_state:
+            self.state.tick()
+        if self.state.should_step(self._last_step):
+            self._last_step = self.state.counter
             self.lr_scheduler.step(*args, **kwargs)
 
     def get_lr(self):
@@ -178,20 +274,32 @@ class GradAccumGradientHandler:
     :type grad_handler: :class:`colossalai.engine.BaseGradientHandler`    
     :param accumulate_size: The number of steps to accumulate gradients
     :type accumulate_size: int
+    :param state: Accumulation state shared with :class:`GradAccumOptimizer`. If not given,
+        the handler counts its own calls
+    :type state: :class:`_GradAccumState`, optional
 
     """
 
-    def __init__(self, grad_handler: BaseGradientHandler, accumulate_size: int) -> None:
+    def __init__(self,
+                 grad_handler: BaseGradientHandler,
+                 accumulate_size: int,
+                 state: _GradAccumState = None) -> None:
         assert isinstance(grad_handler, BaseGradientHandler), \
             f'expected grad_handler to be type BaseGradientHandler, but got {type(grad_handler)}'
         self.grad_handler = grad_handler
         self.accumulate_size = accumulate_size
-        self.accumulate_step = 0
+        # a private state is advanced here, a shared state is advanced by the optimizer
+        self._owns_state = state is None
+        self.state = _GradAccumState(accumulate_size) if state is None else state
+        self._last_step = 0
+
+    @property
+    def accumulate_step(self):
+        return self.state.counter - self._last_step
 
     def handle_gradient(self):
-        self.accumulate_step += 1
-        if self.accumulate_step < self.accumulate_size:
-            pass
-        else:
-            self.accumulate_step = 0
+        if self._owns_state:
+            self.state.tick()
+        if self.state.should_step(self._last_step):
+            self._last_step = self.state.counter
             self.grad_handler.handle_gradient()
@@ -43,8 +43,11 @@ def run_routing(rank, world_size, port, rs=2, hidden_size=128, data_type=torch.f
     grad = torch.randn(ech, device=get_current_device())
     old_out.backward(grad)
 
-    o_tk_grad = tokens.grad.data.clone()
-    o_gt_grad = layer.gate.weight.grad.data.clone()
+    # keep the first gradients in scratch buffers since the grads are zeroed and refilled below
+    tk_grad_scratch = torch.empty_like(tokens)
+    gt_grad_scratch = torch.empty_like(layer.gate.weight)
+    o_tk_grad = tk_grad_scratch.copy_(tokens.grad.detach())
+    o_gt_grad = gt_grad_scratch.copy_(layer.gate.weight.grad.detach())
 
     tokens.grad.zero_()
     layer.gate.weight.grad.zero_()
@@ -58,8 +61,8 @@ def run_routing(rank, world_size, port, rs=2, hidden_size=128, data_type=torch.f
         check_equal(old_out, new_out, 1e-2)
 
     new_out.backward(grad)
-    n_tk_grad = tokens.grad.data.clone()
-    n_gt_grad = layer.gate.weight.grad.data.clone()
+    n_tk_grad = tokens.grad.detach()
+    n_gt_grad = layer.gate.weight.grad.detach()
 
     if data_type == torch.float32:
         check_equal(o_tk_grad, n_tk_grad)
@@ -0,0 +1,129 @@
+from functools import partial
+
+import colossalai
+import pytest
+import torch
+import torch.multiprocessing as mp
+import torch.nn as nn
+from colossalai.amp.naive_amp import convert_to_naive_amp
+from colossalai.core import global_context as gpc
+from colossalai.engine import Engine
+from colossalai.engine.gradient_handler.utils import _split_by_size, bucket_allreduce
+from colossalai.nn.optimizer import ColossalaiOptimizer
+from colossalai.utils import free_port, get_current_device
+from colossalai.utils.gradient_accumulation import GradAccumOptimizer
+from torch.optim import SGD
+
+ACCUM_SIZE = 2
+MAX_NORM = 1.0
+
+
+class ScaleModel(nn.Module):
+
+    def __init__(self, numel=4):
+        super().__init__()
+        self.weight = nn.Parameter(torch.zeros(numel))
+
+    def forward(self, x):
+        return (self.weight * x).sum()
+
+
+def make_param(numel, value):
+    param = nn.Parameter(torch.zeros(numel))
+    param.grad = torch.full((numel,), float(value))
+    return param
+
+
+def check_split_by_size():
+    params = [make_param(4, 0), make_param(4, 0), make_param(8, 0), make_param(2, 0)]
+    # 4 fp32 elements take 16 bytes, so a 32-byte cap packs the first two together
+    # and the 8-element gradient exceeds the cap on its own
+    buckets = _split_by_size(params, bucket_size=32)
+    assert [[p.numel() for p in bucket] for bucket in buckets] == [[4, 4], [8], [2]]
+
+
+def check_bucket_allreduce(rank, world_size):
+    params = [make_param(4, rank + 1), make_param(4, rank + 1), make_param(8, rank + 1)]
+    bucket_allreduce(params, bucket_size=32)
+    expected = sum(range(1, world_size + 1)) / world_size
+    for param in params:
+        assert torch.all(param.grad == expected)
+
+
+def check_fused_grad_accum_optimizer(rank, world_size):
+    model = ScaleModel()
+    optimizer = GradAccumOptimizer(ColossalaiOptimizer(SGD(model.parameters(), lr=1.0)),
+                                   accumulate_size=ACCUM_SIZE,
+                                   model=model,
+                                   fuse_grads=True)
+
+    for _ in range(ACCUM_SIZE):
+        optimizer.zero_grad()
+        optimizer.backward(model(torch.full((4,), float(rank + 1))))
+        optimizer.step()
+
+    # each rank accumulates a gradient of rank + 1, which is then averaged over the data parallel group
+    expected = -sum(range(1, world_size + 1)) / world_size
+    assert torch.all(model.weight.data == expected)
+
+
+def run_bucket_allreduce(rank, world_size, port):
+    colossalai.launch(config=dict(), rank=rank, world_size=world_size, host='localhost', port=port, backend='gloo')
+    check_split_by_size()
+    check_bucket_allreduce(rank, world_size)
+    check_fused_grad_accum_optimizer(rank, world_size)
+    gpc.destroy()
+
+
+@pytest.mark.cpu
+def test_grad_accum_bucket():
+    world_size = 2
+    run_func = partial(run_bucket_allreduce, world_size=world_size, port=free_port())
+    mp.spawn(run_func, nprocs=world_size)
+
+
+def run_engine_clip(rank, world_size, port, use_amp):
+    colossalai.launch(config=dict(), rank=rank, world_size=world_size, host='localhost', port=port, backend='nccl')
+
+    model = ScaleModel().to(get_current_device())
+    optimizer = SGD(model.parameters(), lr=1.0)
+    if use_amp:
+        # naive amp clips inside its own step, on the fp32 master copies of the gradients
+        amp_config = dict(clip_grad_norm=MAX_NORM, dynamic_grad_scale=False, initial_scale=1, verbose=False)
+        model, optimizer = convert_to_naive_amp(model, optimizer, amp_config)
+    else:
+        optimizer = ColossalaiOptimizer(optimizer)
+    optimizer = GradAccumOptimizer(optimizer, accumulate_size=ACCUM_SIZE, model=model, fuse_grads=True)
+    engine = Engine(model=model, optimizer=optimizer, clip_grad_norm=MAX_NORM, verbose=False)
+
+    # the local gradients point in different directions, so clipping before
+    # averaging would give a different result from clipping the average
+    data = torch.zeros(4, device=get_current_device())
+    data[rank] = 3.0 + rank
+    for _ in range(ACCUM_SIZE):
+        engine.zero_grad()
+        engine.backward(engine(data))
+        engine.step()
+
+    avg_grad = torch.zeros(4, device=get_current_device())
+    for i in range(world_size):
+        avg_grad[i] = (3.0 + i) / world_size
+    clipped = avg_grad * min(1.0, MAX_NORM / avg_grad.norm().item())
+    weight = next(model.parameters()).float()
+    assert torch.allclose(weight, -clipped, atol=1e-3)
+
+    gpc.destroy()
+    torch.cuda.empty_cache()
+
+
+@pytest.mark.dist
+@pytest.mark.parametrize('use_amp', [False, True])
+def test_grad_accum_bucket_engine_clip(use_amp):
+    world_size = 2
+    run_func = partial(run_engine_clip, world_size=world_size, port=free_port(), use_amp=use_amp)
+    mp.spawn(run_func, nprocs=world_size)
+
+
+if __name__ == '__main__':
+    test_grad_accum_bucket()
+    test_grad_accum_bucket_engine_clip(False)
@@ -0,0 +1,140 @@
+import pytest
+import torch
+import torch.nn as nn
+from colossalai.engine import BaseGradientHandler
+from colossalai.nn.optimizer import ColossalaiOptimizer
+from colossalai.utils.gradient_accumulation import GradAccumDataloader, accumulate_gradient
+from torch.optim import SGD
+from torch.optim.lr_scheduler import StepLR
+
+NUM_BATCHES = 10
+ACCUM_SIZE = 4
+NUM_CYCLES = 3
+
+
+class CountingIterable:
+    """A non-PyTorch dataloader recording how many batches have been loaded.
+    """
+
+    def __init__(self, num_batches):
+        self.num_batches = num_batches
+        self.consumed = 0
+
+    def __len__(self):
+        return self.num_batches
+
+    def __iter__(self):
+        for i in range(self.num_batches):
+            self.consumed += 1
+            yield i
+
+
+class CountingSGD(SGD):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_steps = 0
+        self.num_zero_grads = 0
+
+    def step(self, *args, **kwargs):
+        self.num_steps += 1
+        return super().step(*args, **kwargs)
+
+    def zero_grad(self, *args, **kwargs):
+        self.num_zero_grads += 1
+        return super().zero_grad(*args, **kwargs)
+
+
+class CountingGradientHandler(BaseGradientHandler):
+
+    def __init__(self, model, optimizer):
+        super().__init__(model, optimizer)
+        self.num_calls = 0
+
+    def handle_gradient(self):
+        self.num_calls += 1
+
+
+@pytest.mark.cpu
+def test_wrappers_share_accumulation_cycle():
+    model = nn.Linear(4, 1)
+    sgd = CountingSGD(model.parameters(), lr=0.1)
+    handler = CountingGradientHandler(model, sgd)
+    lr_scheduler = StepLR(sgd, step_size=1)
+    optimizer, _, handlers, lr_scheduler = accumulate_gradient(model=model,
+                                                               optimizer=ColossalaiOptimizer(sgd),
+                                                               dataloader=list(range(NUM_BATCHES)),
+                                                               accumulate_size=ACCUM_SIZE,
+                                                               gradient_handlers=[handler],
+                                                               lr_scheduler=lr_scheduler)
+    init_epoch = lr_scheduler.last_epoch
+
+    # nothing is stepped before any backward pass
+    optimizer.step()
+    handlers[0].handle_gradient()
+    lr_scheduler.step()
+    assert sgd.num_steps == 0 and handler.num_calls == 0 and lr_scheduler.last_epoch == init_epoch
+
+    for micro_step in range(1, NUM_CYCLES * ACCUM_SIZE + 1):
+        optimizer.zero_grad()
+        assert sgd.num_zero_grads == (micro_step - 1) // ACCUM_SIZE + 1
+
+        optimizer.backward(model(torch.randn(2, 4)).sum())
+        assert optimizer.accumulate_step == (micro_step - 1) % ACCUM_SIZE + 1
+
+        # repeated calls within one micro-step must not fire twice
+        for _ in range(2):
+            handlers[0].handle_gradient()
+            optimizer.step()
+            lr_scheduler.step()
+
+        num_cycles = micro_step // ACCUM_SIZE
+        assert handler.num_calls == num_cycles
+        assert sgd.num_steps == num_cycles
+        assert lr_scheduler.last_epoch == init_epoch + num_cycles
+
+
+@pytest.mark.cpu
+@pytest.mark.parametrize('num_microbatches, accumulate_size, steps_every', [(4, 3, 1), (4, 6, 2), (4, 8, 2)])
+def test_multiple_backward_per_step(num_microbatches, accumulate_size, steps_every):
+    # pipeline schedules call backward once per micro-batch, so the counter advances
+    # by more than one per step and may skip over multiples of accumulate_size
+    model = nn.Linear(4, 1)
+    sgd = CountingSGD(model.parameters(), lr=0.1)
+    handler = CountingGradientHandler(model, sgd)
+    optimizer, _, handlers, _ = accumulate_gradient(model=model,
+                                                    optimizer=ColossalaiOptimizer(sgd),
+                                                    dataloader=list(range(NUM_BATCHES)),
+                                                    accumulate_size=accumulate_size,
+                                                    gradient_handlers=[handler])
+
+    for step in range(1, NUM_CYCLES * steps_every + 1):
+        optimizer.zero_grad()
+        for _ in range(num_microbatches):
+            optimizer.backward(model(torch.randn(2, 4)).sum())
+        handlers[0].handle_gradient()
+        optimizer.step()
+
+        assert handler.num_calls == step // steps_every
+        assert sgd.num_steps == step // steps_every
+        assert sgd.num_zero_grads == (step - 1) // steps_every + 1
+
+
+@pytest.mark.cpu
+def test_dataloader_consumes_remaining_data():
+    data = CountingIterable(NUM_BATCHES)
+    dataloader = GradAccumDataloader(data, accumulate_size=ACCUM_SIZE)
+    assert dataloader.consume_remain_data
+
+    batches = list(dataloader)
+    steps_per_epoch = NUM_BATCHES - NUM_BATCHES % ACCUM_SIZE
+    assert batches == list(range(steps_per_epoch))
+    # the last incomplete accumulation cycle is loaded and dropped
+    assert data.consumed == NUM_BATCHES
+    assert next(dataloader._dataiter, None) is None
+
+
+if __name__ == '__main__':
+    test_wrappers_share_accumulation_cycle()
+    test_multiple_backward_per_step(4, 3, 1)
+    test_dataloader_consumes_remaining_data()